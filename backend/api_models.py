@@ -1,6 +1,8 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
+from .config import MAX_TOP_K
+
 
 class IngestPayload(BaseModel):
     mongo_id: str = Field(..., description="MongoDB _id as string")
@@ -11,10 +13,40 @@ class IngestPayload(BaseModel):
     embedding: Optional[List[float]] = None
 
 
+class IngestBatchPayload(BaseModel):
+    items: List[IngestPayload] = Field(..., min_length=1)
+
+
 class SearchRequest(BaseModel):
     query: str
-    top_k: int = Field(5, ge=1, le=50)
+    top_k: int = Field(5, ge=1, le=MAX_TOP_K)
+
+
+class SearchResult(BaseModel):
+    id: str
+    document: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
 
 
 class DeletePayload(BaseModel):
     mongo_id: str
+
+
+class IngestResponse(BaseModel):
+    status: str
+    id: str
+
+
+class IngestBatchResponse(BaseModel):
+    status: str
+    count: int
+
+
+class DeleteResponse(BaseModel):
+    status: str
+    id: str
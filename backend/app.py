@@ -1,39 +1,142 @@
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+
+from .config import MAX_BODY_BYTES, WORKER_BATCH_SIZE
+from .api_models import (
+    IngestPayload,
+    IngestResponse,
+    IngestBatchPayload,
+    IngestBatchResponse,
+    SearchRequest,
+    SearchResponse,
+    DeletePayload,
+    DeleteResponse,
+)
+from .vector_store import (
+    upsert_document,
+    upsert_documents,
+    query_documents,
+    delete_document,
+    ensure_search_ef,
+    warmup,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ensure_search_ef()
+    warmup()
+    yield
 
-from .api_models import IngestPayload, SearchRequest, DeletePayload
-from .vector_store import upsert_document, query_documents, delete_document
 
 app = FastAPI(
     title="Mongo → Chroma Vector API",
     version="1.0.0",
     description="Core vector service for syncing MongoDB documents into ChromaDB.",
+    lifespan=lifespan,
 )
 
 
-def build_text_from_payload(p: IngestPayload) -> str:
-    tags_str = ", ".join(p.tags) if p.tags else ""
-    return f"Title: {p.title}\nBody: {p.body}\nTags: {tags_str}".strip()
+def _reject(status_code: int, detail: str) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code)
 
 
-@app.get("/health")
-async def health():
-    return {"status": "ok"}
+class BodySizeLimitMiddleware:
+    """
+    Pure ASGI guard that rejects oversized ingest bodies before they are parsed.
+    Only POSTs to paths in `limits` are inspected; everything else passes
+    straight through. A declared Content-Length is checked up front; a
+    chunked body is read here up to the cap and then replayed to the app.
+    """
 
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = self.limits.get(scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            if not content_length.isdigit():
+                await _reject(400, "Invalid Content-Length")(scope, receive, send)
+            elif int(content_length) > limit:
+                await _reject(413, "Payload too large")(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                await _reject(413, "Payload too large")(scope, receive, send)
+                return
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, replay, send)
+
+
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        "/ingest": MAX_BODY_BYTES,
+        "/ingest-batch": MAX_BODY_BYTES * WORKER_BATCH_SIZE,
+    },
+)
 
-@app.post("/ingest")
-async def ingest_document(payload: IngestPayload):
-    text = build_text_from_payload(payload)
 
+def build_document_from_payload(p: IngestPayload) -> Tuple[str, dict]:
+    """
+    Build the indexed text and Chroma metadata for one payload.
+    Tags are joined once and shared by both.
+    """
     # Chroma metadata must be scalar-valued → convert list → string
-    tags_value = ", ".join(payload.tags) if payload.tags else None
-
+    tags_str = ", ".join(p.tags) if p.tags else ""
+    text = "Title: " + p.title + "\nBody: " + p.body
     metadata = {
         "source": "mongo",
-        "title": payload.title,
+        "title": p.title,
     }
-    if tags_value is not None:
-        metadata["tags"] = tags_value
+    if tags_str:
+        text += "\nTags: " + tags_str
+        metadata["tags"] = tags_str
+    return text, metadata
 
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.post("/ingest", response_model=IngestResponse)
+def ingest_document(payload: IngestPayload):
+    text, metadata = build_document_from_payload(payload)
     upsert_document(
         doc_id=payload.mongo_id,
         document=text,
@@ -41,11 +144,50 @@ async def ingest_document(payload: IngestPayload):
         embedding=payload.embedding,  # optional
     )
 
-    return {"status": "ingested", "id": payload.mongo_id}
+    return IngestResponse(status="ingested", id=payload.mongo_id)
+
+
+@app.post("/ingest-batch", response_model=IngestBatchResponse)
+def ingest_batch(payload: IngestBatchPayload):
+    """
+    Batch variant of /ingest.
+    One Chroma upsert for the whole batch, so documents are embedded together.
+    Embeddings must be provided for every item or for none of them, and each
+    mongo_id may appear only once.
+    """
+    items = payload.items
+    doc_ids = [item.mongo_id for item in items]
+    if len(set(doc_ids)) != len(doc_ids):
+        raise HTTPException(
+            status_code=400,
+            detail="mongo_id must be unique within a batch",
+        )
+    provided = [item.embedding is not None for item in items]
+    if any(provided) and not all(provided):
+        raise HTTPException(
+            status_code=400,
+            detail="embedding must be provided for all items or none",
+        )
+
+    documents = []
+    metadatas = []
+    for item in items:
+        text, metadata = build_document_from_payload(item)
+        documents.append(text)
+        metadatas.append(metadata)
+
+    upsert_documents(
+        doc_ids=doc_ids,
+        documents=documents,
+        metadatas=metadatas,
+        embeddings=[item.embedding for item in items] if all(provided) else None,
+    )
+
+    return IngestBatchResponse(status="ingested", count=len(items))
 
 
-@app.post("/search")
-async def search(req: SearchRequest):
+@app.post("/search", response_model=SearchResponse)
+def search(req: SearchRequest):
     """
     Core search endpoint.
     - Vector search over the Chroma index
@@ -54,26 +196,21 @@ async def search(req: SearchRequest):
     res = query_documents(req.query, top_k=req.top_k)
 
     if not res["ids"] or len(res["ids"][0]) == 0:
-        return {"query": req.query, "results": []}
+        return SearchResponse(query=req.query, results=[])
 
     docs = res["documents"][0]
     ids = res["ids"][0]
     metas = res["metadatas"][0]
 
-    results = []
-    for _id, doc, meta in zip(ids, docs, metas):
-        results.append(
-            {
-                "id": _id,
-                "document": doc,
-                "metadata": meta,
-            }
-        )
+    results = [
+        {"id": _id, "document": doc, "metadata": meta}
+        for _id, doc, meta in zip(ids, docs, metas)
+    ]
 
-    return {"query": req.query, "results": results}
+    return SearchResponse(query=req.query, results=results)
 
 
-@app.post("/delete")
-async def delete(req: DeletePayload):
+@app.post("/delete", response_model=DeleteResponse)
+def delete(req: DeletePayload):
     delete_document(req.mongo_id)
-    return {"status": "deleted", "id": req.mongo_id}
+    return DeleteResponse(status="deleted", id=req.mongo_id)
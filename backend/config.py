@@ -11,7 +11,7 @@ load_dotenv(BASE_ENV_PATH)
 APP_ENV = os.getenv("APP_ENV", "development")
 ENV_SPECIFIC = ROOT_DIR / f".env.{APP_ENV}"
 if ENV_SPECIFIC.exists():
-load_dotenv(ENV_SPECIFIC, override=True)
+    load_dotenv(ENV_SPECIFIC, override=True)
 
 # Fail fast if required vars are missing to avoid accidental defaults in production.
 REQUIRED_VARS = [
@@ -64,7 +64,12 @@ CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION")
 CHROMA_HNSW_SPACE = os.getenv("CHROMA_HNSW_SPACE", "cosine")
 CHROMA_HNSW_M = int(os.getenv("CHROMA_HNSW_M", "32"))
 CHROMA_HNSW_CONSTRUCTION_EF = int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", "200"))
-CHROMA_HNSW_SEARCH_EF = int(os.getenv("CHROMA_HNSW_SEARCH_EF", "50"))
+CHROMA_HNSW_SEARCH_EF = int(os.getenv("CHROMA_HNSW_SEARCH_EF", "100"))
+# Largest top_k /search accepts; search_ef is clamped to at least 2 * this.
+MAX_TOP_K = 50
+CHROMA_UPSERT_CHUNK = int(os.getenv("CHROMA_UPSERT_CHUNK", "128"))
+if CHROMA_UPSERT_CHUNK < 1:
+    raise RuntimeError(f"CHROMA_UPSERT_CHUNK must be >= 1, got {CHROMA_UPSERT_CHUNK}")
 
 # Optional Gemini (test only)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -73,6 +78,9 @@ GEMINI_EMBED_MODEL = os.getenv("GEMINI_EMBED_MODEL", "text-embedding-004")
 
 # Request payload limits
 MAX_DOC_CHARS = int(os.getenv("MAX_DOC_CHARS", "12000"))
+# Raw request body cap; must leave room for embeddings and JSON \u escaping.
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", "262144"))
 
 # Worker batching
 WORKER_BATCH_SIZE = int(os.getenv("WORKER_BATCH_SIZE", "50"))
+WORKER_FLUSH_INTERVAL_SEC = float(os.getenv("WORKER_FLUSH_INTERVAL_SEC", "1.0"))
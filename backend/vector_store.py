@@ -1,9 +1,20 @@
+from pathlib import Path
 from typing import Dict, Any, List
+import sqlite3
 
 import chromadb
 from chromadb.config import Settings
 
-from .config import CHROMA_DIR, CHROMA_COLLECTION
+from .config import (
+    CHROMA_DIR,
+    CHROMA_COLLECTION,
+    CHROMA_HNSW_SPACE,
+    CHROMA_HNSW_M,
+    CHROMA_HNSW_CONSTRUCTION_EF,
+    CHROMA_HNSW_SEARCH_EF,
+    CHROMA_UPSERT_CHUNK,
+    MAX_TOP_K,
+)
 
 
 # Embedded Chroma instance
@@ -12,12 +23,75 @@ client = chromadb.PersistentClient(
     settings=Settings(anonymized_telemetry=False),
 )
 
+
+def _enable_wal() -> None:
+    """
+    Switch Chroma's SQLite store to WAL journaling.
+    journal_mode is stored in the database file, so it applies to every
+    connection Chroma opens, whatever its version or connection pooling.
+    Per-connection pragmas (synchronous, mmap_size, ...) would not, so none
+    are set here.
+    """
+    db_path = Path(CHROMA_DIR) / "chroma.sqlite3"
+    if not db_path.exists():
+        print(f"[WARN] Chroma SQLite file not found at {db_path}; WAL not enabled")
+        return
+    try:
+        conn = sqlite3.connect(db_path, timeout=5)
+        try:
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        finally:
+            conn.close()
+        if mode.lower() != "wal":
+            print(f"[WARN] Chroma SQLite store stayed in {mode} journal mode")
+    except sqlite3.Error as e:
+        print(f"[WARN] Could not enable WAL on Chroma store: {e}")
+
+
+_enable_wal()
+
+# search_ef is kept >= 2 * the largest allowed top_k for recall.
+SEARCH_EF = max(CHROMA_HNSW_SEARCH_EF, 2 * MAX_TOP_K)
+
 collection = client.get_or_create_collection(
     name=CHROMA_COLLECTION,
-    metadata={"hnsw:space": "cosine"},
+    # Creation-time HNSW params; ensure_search_ef() raises ef on existing ones.
+    metadata={
+        "hnsw:space": CHROMA_HNSW_SPACE,
+        "hnsw:M": CHROMA_HNSW_M,
+        "hnsw:construction_ef": CHROMA_HNSW_CONSTRUCTION_EF,
+        "hnsw:search_ef": SEARCH_EF,
+    },
 )
 
 
+def ensure_search_ef() -> None:
+    """
+    Raise ef_search on a collection created with a lower value.
+    Chroma versions without runtime HNSW configuration just keep their value.
+    """
+    try:
+        hnsw = (collection.configuration or {}).get("hnsw") or {}
+        current = hnsw.get("ef_search")
+        if current is not None and current < SEARCH_EF:
+            collection.modify(configuration={"hnsw": {"ef_search": SEARCH_EF}})
+            print(f"Raised Chroma ef_search from {current} to {SEARCH_EF}")
+    except Exception as e:
+        print(f"[WARN] Could not update Chroma ef_search: {e}")
+
+
+def warmup() -> None:
+    """
+    Run one throwaway query so the embedding model and HNSW index are loaded
+    before the first real /search instead of during it.
+    """
+    try:
+        if collection.count() > 0:
+            collection.query(query_texts=["warmup"], n_results=1)
+    except Exception as e:
+        print(f"[WARN] Chroma warmup failed: {e}")
+
+
 def upsert_document(
     doc_id: str,
     document: str,
@@ -40,6 +114,32 @@ def upsert_document(
     collection.upsert(**kwargs)
 
 
+def upsert_documents(
+    doc_ids: List[str],
+    documents: List[str],
+    metadatas: List[Dict[str, Any]],
+    embeddings: List[List[float]] | None = None,
+) -> None:
+    """
+    Batch upsert into Chroma.
+    Documents are sent in chunks of CHROMA_UPSERT_CHUNK, so when no
+    embeddings are provided the collection's embedding function runs once
+    per chunk instead of once per document, and oversized batches are kept
+    in the range Chroma ingests fastest.
+    """
+    for start in range(0, len(doc_ids), CHROMA_UPSERT_CHUNK):
+        end = start + CHROMA_UPSERT_CHUNK
+        kwargs: Dict[str, Any] = {
+            "ids": doc_ids[start:end],
+            "documents": documents[start:end],
+            "metadatas": metadatas[start:end],
+        }
+        if embeddings is not None:
+            kwargs["embeddings"] = embeddings[start:end]
+
+        collection.upsert(**kwargs)
+
+
 def delete_document(doc_id: str) -> None:
     collection.delete(ids=[doc_id])
 
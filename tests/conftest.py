@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+# backend.config fails fast without these, and vector_store opens Chroma on import.
+os.environ.update(
+    {
+        "APP_ENV": "development",
+        "MONGO_URI": "mongodb://localhost:27017",
+        "MONGO_DB": "test",
+        "MONGO_COLLECTION": "articles",
+        "CHROMA_DIR": tempfile.mkdtemp(prefix="chroma_test_"),
+        "CHROMA_COLLECTION": "test",
+    }
+)
+
+from backend import app as app_module  # noqa: E402
+
+
+@pytest.fixture
+def upserts(monkeypatch):
+    """Capture upsert calls instead of embedding and writing to Chroma."""
+    calls = []
+    monkeypatch.setattr(app_module, "upsert_document", lambda **kw: calls.append(kw))
+    monkeypatch.setattr(app_module, "upsert_documents", lambda **kw: calls.append(kw))
+    return calls
+
+
+@pytest.fixture
+def client():
+    return TestClient(app_module.app)
@@ -0,0 +1,121 @@
+import json
+
+from backend import app as app_module
+from backend.config import MAX_BODY_BYTES, MAX_DOC_CHARS
+
+
+def _item(mongo_id, embedding=None):
+    item = {"mongo_id": mongo_id, "title": "Title", "body": "Body", "tags": ["a", "b"]}
+    if embedding is not None:
+        item["embedding"] = embedding
+    return item
+
+
+def test_ingest_batch_upserts_all_items(client, upserts):
+    r = client.post("/ingest-batch", json={"items": [_item("1"), _item("2")]})
+
+    assert r.status_code == 200
+    assert r.json() == {"status": "ingested", "count": 2}
+    assert upserts[0]["doc_ids"] == ["1", "2"]
+    assert upserts[0]["embeddings"] is None
+    assert upserts[0]["metadatas"][0] == {"source": "mongo", "title": "Title", "tags": "a, b"}
+
+
+def test_ingest_batch_rejects_mixed_embeddings(client, upserts):
+    items = [_item("1", embedding=[0.1, 0.2]), _item("2")]
+    r = client.post("/ingest-batch", json={"items": items})
+
+    assert r.status_code == 400
+    assert upserts == []
+
+
+def test_ingest_batch_rejects_duplicate_ids(client, upserts):
+    r = client.post("/ingest-batch", json={"items": [_item("1"), _item("1")]})
+
+    assert r.status_code == 400
+    assert upserts == []
+
+
+def test_ingest_accepts_payload_with_embedding(client, upserts):
+    payload = {
+        "mongo_id": "1",
+        "title": "Title",
+        "body": "x" * 2000,
+        "embedding": [0.123456789012345] * 1536,
+    }
+    r = client.post("/ingest", json=payload)
+
+    assert r.status_code == 200
+    assert len(upserts[0]["embedding"]) == 1536
+
+
+def test_ingest_accepts_escaped_non_ascii_body(client, upserts):
+    # json.dumps escapes each CJK char to a 6-byte \uXXXX sequence.
+    payload = {"mongo_id": "1", "title": "Title", "body": "文" * MAX_DOC_CHARS}
+    r = client.post(
+        "/ingest",
+        content=json.dumps(payload),
+        headers={"Content-Type": "application/json"},
+    )
+
+    assert r.status_code == 200
+
+
+def test_ingest_rejects_oversized_body(client, upserts):
+    body = "x" * (MAX_BODY_BYTES + 1)
+    r = client.post("/ingest", json={"mongo_id": "1", "title": "Title", "body": body})
+
+    assert r.status_code == 413
+    assert upserts == []
+
+
+def test_search_returns_results(client, monkeypatch):
+    res = {"ids": [["1"]], "documents": [["Title: t"]], "metadatas": [[{"source": "mongo"}]]}
+    monkeypatch.setattr(app_module, "query_documents", lambda query, top_k: res)
+    r = client.post("/search", json={"query": "q", "top_k": 1})
+
+    assert r.status_code == 200
+    assert r.json() == {
+        "query": "q",
+        "results": [{"id": "1", "document": "Title: t", "metadata": {"source": "mongo"}}],
+    }
+
+
+def test_search_returns_empty_results(client, monkeypatch):
+    res = {"ids": [[]], "documents": [[]], "metadatas": [[]]}
+    monkeypatch.setattr(app_module, "query_documents", lambda query, top_k: res)
+    r = client.post("/search", json={"query": "q"})
+
+    assert r.status_code == 200
+    assert r.json() == {"query": "q", "results": []}
+
+
+def _chunked(data, size=65536):
+    # A generator body makes the client send Transfer-Encoding: chunked.
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_ingest_accepts_small_chunked_body(client, upserts):
+    payload = json.dumps({"mongo_id": "1", "title": "Title", "body": "Body"}).encode()
+    r = client.post(
+        "/ingest",
+        content=_chunked(payload),
+        headers={"Content-Type": "application/json"},
+    )
+
+    assert r.status_code == 200
+    assert upserts[0]["doc_id"] == "1"
+
+
+def test_ingest_rejects_oversized_chunked_body(client, upserts):
+    body = "x" * (4 * MAX_BODY_BYTES)
+    payload = json.dumps({"mongo_id": "1", "title": "Title", "body": body}).encode()
+    r = client.post(
+        "/ingest",
+        content=_chunked(payload),
+        headers={"Content-Type": "application/json"},
+    )
+
+    assert r.status_code == 413
+    assert upserts == []
@@ -0,0 +1,25 @@
+from backend import vector_store
+
+
+def test_ensure_search_ef_raises_existing_collection(monkeypatch):
+    coll = vector_store.client.get_or_create_collection(
+        name="low_ef", metadata={"hnsw:search_ef": 50}
+    )
+    monkeypatch.setattr(vector_store, "collection", coll)
+
+    vector_store.ensure_search_ef()
+
+    stored = vector_store.client.get_collection("low_ef").configuration["hnsw"]
+    assert stored["ef_search"] == vector_store.SEARCH_EF
+
+
+def test_ensure_search_ef_keeps_higher_value(monkeypatch):
+    coll = vector_store.client.get_or_create_collection(
+        name="high_ef", metadata={"hnsw:search_ef": 400}
+    )
+    monkeypatch.setattr(vector_store, "collection", coll)
+
+    vector_store.ensure_search_ef()
+
+    stored = vector_store.client.get_collection("high_ef").configuration["hnsw"]
+    assert stored["ef_search"] == 400
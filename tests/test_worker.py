@@ -0,0 +1,218 @@
+import pytest
+import requests
+from bson import json_util
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from worker import mongo_stream_worker as worker
+
+
+class _FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+
+def _fake_post(monkeypatch, statuses):
+    """Answer POSTs with the status for their path (a list is consumed in order)."""
+    calls = []
+
+    def post(url, json, timeout):
+        path = url[len(worker.API_BASE):]
+        calls.append((path, json))
+        status = statuses[path]
+        return _FakeResponse(status.pop(0) if isinstance(status, list) else status)
+
+    monkeypatch.setattr(worker._session, "post", post)
+    return calls
+
+
+def _docs(*ids):
+    return [{"_id": i, "title": "t", "body": "b"} for i in ids]
+
+
+def test_post_batch_skips_docs_rejected_individually(monkeypatch):
+    calls = _fake_post(monkeypatch, {"/ingest-batch": 422, "/ingest": [200, 422, 200]})
+
+    assert worker._post_batch(_docs("1", "2", "3")) is True
+    assert [path for path, _ in calls] == ["/ingest-batch", "/ingest", "/ingest", "/ingest"]
+
+
+def test_post_batch_retries_on_server_error(monkeypatch):
+    calls = _fake_post(monkeypatch, {"/ingest-batch": 500})
+
+    assert worker._post_batch(_docs("1", "2")) is False
+    assert [path for path, _ in calls] == ["/ingest-batch"]
+
+
+@pytest.mark.parametrize("status", [401, 404, 429])
+def test_post_batch_retries_on_non_payload_client_error(monkeypatch, status):
+    calls = _fake_post(monkeypatch, {"/ingest-batch": status})
+
+    assert worker._post_batch(_docs("1", "2")) is False
+    assert [path for path, _ in calls] == ["/ingest-batch"]
+
+
+def test_post_each_stops_on_non_payload_client_error(monkeypatch):
+    _fake_post(monkeypatch, {"/ingest-batch": 422, "/ingest": [200, 401]})
+
+    assert worker._post_batch(_docs("1", "2", "3")) is False
+
+
+def test_post_each_stops_on_server_error(monkeypatch):
+    _fake_post(monkeypatch, {"/ingest-batch": 413, "/ingest": [200, 503]})
+
+    assert worker._post_batch(_docs("1", "2", "3")) is False
+
+
+def test_flush_posts_in_batch_size_slices(monkeypatch):
+    posted = []
+    monkeypatch.setattr(worker, "WORKER_BATCH_SIZE", 2)
+    monkeypatch.setattr(worker, "_post_batch", lambda docs: posted.append(docs) or True)
+    buf = {doc["_id"]: doc for doc in _docs("1", "2", "3")}
+
+    assert worker._flush(buf) is True
+    assert [[doc["_id"] for doc in docs] for docs in posted] == [["1", "2"], ["3"]]
+    assert buf == {}
+
+
+def test_flush_keeps_undelivered_slices(monkeypatch):
+    results = iter([True, False])
+    monkeypatch.setattr(worker, "WORKER_BATCH_SIZE", 2)
+    monkeypatch.setattr(worker, "_post_batch", lambda docs: next(results))
+    buf = {doc["_id"]: doc for doc in _docs("1", "2", "3")}
+
+    assert worker._flush(buf) is False
+    assert list(buf) == ["3"]
+
+
+class _Stop(Exception):
+    """Ends run_change_stream_worker's otherwise endless loop in tests."""
+
+
+class _FakeStream:
+    """Yields scripted (doc, token) steps, then fails like a dropped connection."""
+
+    def __init__(self, steps, log):
+        self.steps = list(steps)
+        self.log = log
+        self.alive = True
+        self.resume_token = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def try_next(self):
+        if not self.steps:
+            raise AutoReconnect("connection dropped")
+        step = self.steps.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        doc, self.resume_token = step
+        if doc is None:
+            return None
+        self.log.append(f"read {doc['_id']}")
+        return {"operationType": "insert", "fullDocument": doc}
+
+
+class _FakeCollection:
+    def __init__(self, streams, log):
+        self.streams = list(streams)
+        self.log = log
+        self.resume_after = []
+
+    def watch(self, pipeline, resume_after=None, **kwargs):
+        self.resume_after.append(resume_after)
+        if not self.streams:
+            raise _Stop()
+        return _FakeStream(self.streams.pop(0), self.log)
+
+
+def _run_change_stream(monkeypatch, tmp_path, coll, post_results, batch_size):
+    log = coll.log
+    results = iter(post_results)
+
+    def post_batch(docs):
+        ok = next(results)
+        log.append(f"post {','.join(doc['_id'] for doc in docs)} {'ok' if ok else 'fail'}")
+        return ok
+
+    checkpoint_file = tmp_path / "checkpoint"
+    monkeypatch.setattr(worker, "WORKER_CHECKPOINT_FILE", str(checkpoint_file))
+    monkeypatch.setattr(worker, "WORKER_BATCH_SIZE", batch_size)
+    monkeypatch.setattr(worker, "WORKER_FLUSH_INTERVAL_SEC", 0)
+    monkeypatch.setattr(worker, "_get_collection", lambda: coll)
+    monkeypatch.setattr(worker, "_post_batch", post_batch)
+    monkeypatch.setattr(worker, "_catch_up", lambda c: log.append("catch up") or True)
+    monkeypatch.setattr(worker.time, "sleep", lambda sec: None)
+
+    with pytest.raises(_Stop):
+        worker.run_change_stream_worker()
+    return checkpoint_file
+
+
+def test_change_stream_retries_failed_flush_and_resumes(monkeypatch, tmp_path):
+    t1 = {"_data": "t1"}
+    log = []
+    coll = _FakeCollection([[({"_id": "A"}, t1), (None, t1)]], log)
+
+    checkpoint_file = _run_change_stream(
+        monkeypatch, tmp_path, coll, post_results=[False, True], batch_size=2
+    )
+
+    assert log == ["catch up", "read A", "post A fail", "post A ok"]
+    # The reopened stream resumes after the delivered event, without a rescan.
+    assert coll.resume_after == [None, t1]
+    assert json_util.loads(checkpoint_file.read_text()) == t1
+
+
+def test_change_stream_stops_reading_while_full_buffer_is_undeliverable(monkeypatch, tmp_path):
+    ta, tb = {"_data": "ta"}, {"_data": "tb"}
+    log = []
+    coll = _FakeCollection([[({"_id": "A"}, ta), ({"_id": "B"}, tb)]], log)
+
+    _run_change_stream(
+        monkeypatch, tmp_path, coll, post_results=[False, False, True, True], batch_size=1
+    )
+
+    assert log == [
+        "catch up",
+        "read A",
+        "post A fail",
+        "post A fail",
+        "post A ok",
+        "read B",
+        "post B ok",
+    ]
+    assert coll.resume_after == [None, tb]
+
+
+def test_change_stream_restart_resumes_from_checkpoint(monkeypatch, tmp_path):
+    saved = {"_data": "saved"}
+    (tmp_path / "checkpoint").write_text(json_util.dumps(saved))
+    log = []
+    coll = _FakeCollection([[]], log)
+
+    _run_change_stream(monkeypatch, tmp_path, coll, post_results=[], batch_size=2)
+
+    assert "catch up" not in log
+    assert coll.resume_after == [saved, saved]
+
+
+def test_change_stream_catches_up_when_history_is_lost(monkeypatch, tmp_path):
+    saved = {"_data": "saved"}
+    (tmp_path / "checkpoint").write_text(json_util.dumps(saved))
+    log = []
+    lost = OperationFailure("resume point lost", code=worker.CHANGE_STREAM_HISTORY_LOST)
+    coll = _FakeCollection([[lost], []], log)
+
+    _run_change_stream(monkeypatch, tmp_path, coll, post_results=[], batch_size=2)
+
+    assert log == ["catch up"]
+    assert coll.resume_after == [saved, None, None]
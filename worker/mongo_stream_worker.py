@@ -1,21 +1,162 @@
+import os
 import time
 from datetime import datetime
+from itertools import islice
 
 import requests
+from requests.adapters import HTTPAdapter
 from pymongo import MongoClient
+from pymongo.errors import OperationFailure, PyMongoError
+from bson import json_util
 from bson.objectid import ObjectId
 
-from backend.config import MONGO_URI, MONGO_DB, MONGO_COLLECTION
+from backend.config import (
+    API_BASE,
+    MONGO_URI,
+    MONGO_DB,
+    MONGO_COLLECTION,
+    POLL_INTERVAL_SEC,
+    USE_CHANGE_STREAM,
+    WORKER_BATCH_SIZE,
+    WORKER_CHECKPOINT_FILE,
+    WORKER_FLUSH_INTERVAL_SEC,
+)
 
-API_BASE = "http://localhost:8000"
+# Keep-alive session so each POST reuses a pooled connection to the API.
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_maxsize=4))
+_session.mount("https://", HTTPAdapter(pool_maxsize=4))
 
-POLL_INTERVAL_SEC = 5
+# Only the fields the API needs travel over the wire.
+MONGO_PROJECTION = {"_id": 1, "title": 1, "body": 1, "tags": 1}
+
+
+def _payload_from_doc(doc) -> dict:
+    return {
+        "mongo_id": str(doc["_id"]),
+        "title": doc.get("title", ""),
+        "body": doc.get("body", ""),
+        "tags": doc.get("tags", []),
+    }
+
+
+# Statuses meaning the payload itself was rejected. Any other 4xx (wrong
+# API_BASE, missing token, rate limiting, ...) is retried like a 5xx, or the
+# whole backlog would be skipped.
+BAD_PAYLOAD_STATUSES = {400, 413, 422}
+
+
+def _is_bad_payload(e: requests.HTTPError) -> bool:
+    return e.response is not None and e.response.status_code in BAD_PAYLOAD_STATUSES
+
+
+def _post_batch(docs) -> bool:
+    """
+    Send docs to /ingest-batch.
+    Returns False on retryable failures so the caller retries from its
+    checkpoint. A bad-payload status means some doc in the batch is bad, so
+    fall back to posting docs one by one and skip the rejected ones; otherwise
+    a single poison doc would block every later doc.
+    """
+    items = [_payload_from_doc(doc) for doc in docs]
+    try:
+        r = _session.post(f"{API_BASE}/ingest-batch", json={"items": items}, timeout=30)
+        r.raise_for_status()
+    except requests.HTTPError as e:
+        if not _is_bad_payload(e):
+            print(f"[ERROR] Failed to call /ingest-batch: {e}")
+            return False
+        print(f"[WARN] /ingest-batch rejected batch ({e}); posting docs one by one")
+        return _post_each(items)
+    except requests.RequestException as e:
+        print(f"[ERROR] Failed to call /ingest-batch: {e}")
+        return False
+
+    print(
+        f"[{datetime.utcnow().isoformat()}] Synced {len(items)} Mongo docs "
+        f"(up to _id={items[-1]['mongo_id']}) to Chroma"
+    )
+    return True
+
+
+def _post_each(items) -> bool:
+    synced = 0
+    for item in items:
+        try:
+            r = _session.post(f"{API_BASE}/ingest", json=item, timeout=10)
+            r.raise_for_status()
+            synced += 1
+        except requests.HTTPError as e:
+            if not _is_bad_payload(e):
+                print(f"[ERROR] Failed to call /ingest: {e}")
+                return False
+            print(
+                f"[ERROR] Skipping Mongo _id={item['mongo_id']}: "
+                f"{e.response.status_code} {e.response.text}"
+            )
+        except requests.RequestException as e:
+            print(f"[ERROR] Failed to call /ingest: {e}")
+            return False
+
+    print(
+        f"[{datetime.utcnow().isoformat()}] Synced {synced}/{len(items)} Mongo docs "
+        f"(up to _id={items[-1]['mongo_id']}) to Chroma"
+    )
+    return True
+
+
+def _get_collection():
+    # One long-lived client; its pool reconnects on its own after outages.
+    client = MongoClient(
+        MONGO_URI,
+        maxPoolSize=10,
+        minPoolSize=1,
+        serverSelectionTimeoutMS=2000,
+    )
+    return client[MONGO_DB][MONGO_COLLECTION]
+
+
+# Each poll is capped; a full poll means more backlog, so skip the sleep.
+POLL_LIMIT = WORKER_BATCH_SIZE * 20
+
+
+def _poll_once(coll, last_seen_id):
+    """
+    Sync up to POLL_LIMIT docs with _id > last_seen_id, in _id order.
+    The cursor is streamed and flushed every WORKER_BATCH_SIZE docs, so memory
+    stays bounded and the first batch is posted while Mongo keeps fetching.
+    Returns (last_seen_id, ok, fetched); PyMongoError propagates.
+    """
+    query = {}
+    if last_seen_id is not None:
+        query = {"_id": {"$gt": last_seen_id}}
+
+    fetched = 0
+    batch = []
+    with (
+        coll.find(query, projection=MONGO_PROJECTION)
+        .hint("_id_")
+        .sort("_id", 1)
+        .limit(POLL_LIMIT)
+        .batch_size(WORKER_BATCH_SIZE)
+    ) as cursor:
+        for doc in cursor:
+            fetched += 1
+            batch.append(doc)
+            if len(batch) == WORKER_BATCH_SIZE:
+                if not _post_batch(batch):
+                    return last_seen_id, False, fetched
+                last_seen_id = batch[-1]["_id"]
+                batch = []
+    if batch:
+        if not _post_batch(batch):
+            return last_seen_id, False, fetched
+        last_seen_id = batch[-1]["_id"]
+    return last_seen_id, True, fetched
 
 
 def run_polling_worker():
-    client = MongoClient(MONGO_URI)
-    db = client[MONGO_DB]
-    coll = db[MONGO_COLLECTION]
+    coll = _get_collection()
 
     print(f"Starting polling worker (every {POLL_INTERVAL_SEC}s)…")
 
@@ -23,32 +164,171 @@ def run_polling_worker():
     last_seen_id = None
 
     while True:
-        query = {}
-        if last_seen_id is not None:
-            query = {"_id": {"$gt": last_seen_id}}
-
-        docs = list(coll.find(query).sort("_id", 1))
-
-        for doc in docs:
-            payload = {
-                "mongo_id": str(doc["_id"]),
-                "title": doc.get("title", ""),
-                "body": doc.get("body", ""),
-                "tags": doc.get("tags", []),
+        try:
+            last_seen_id, ok, fetched = _poll_once(coll, last_seen_id)
+        except PyMongoError as e:
+            print(f"[ERROR] MongoDB poll failed: {e}")
+            ok, fetched = False, 0
+
+        if not ok or fetched < POLL_LIMIT:
+            time.sleep(POLL_INTERVAL_SEC)
+
+
+class _RetryLater(Exception):
+    """Abandon the current stream and reopen it after a pause."""
+
+
+# Server error code for a resume token that has fallen off the oplog.
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+def _load_resume_token():
+    try:
+        with open(WORKER_CHECKPOINT_FILE) as f:
+            return json_util.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"[WARN] Ignoring unreadable checkpoint {WORKER_CHECKPOINT_FILE}: {e}")
+        return None
+
+
+def _save_resume_token(token) -> None:
+    # Write then rename, so a crash never leaves a half-written checkpoint.
+    tmp_path = f"{WORKER_CHECKPOINT_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(json_util.dumps(token))
+    os.replace(tmp_path, WORKER_CHECKPOINT_FILE)
+
+
+def _catch_up(coll) -> bool:
+    """
+    Full _id scan, used when the stream cannot resume from a saved token, so
+    writes made while no stream was open are still synced.
+    """
+    print("No resume token; catching up with a full scan…")
+    last_seen_id = None
+    while True:
+        last_seen_id, ok, fetched = _poll_once(coll, last_seen_id)
+        if not ok:
+            return False
+        if fetched < POLL_LIMIT:
+            return True
+
+
+def _flush(buf) -> bool:
+    """
+    Post buffered docs in WORKER_BATCH_SIZE slices, dropping each slice from
+    `buf` once it has been delivered. Returns False if a slice must be retried.
+    """
+    while buf:
+        ids = list(islice(buf, WORKER_BATCH_SIZE))
+        if not _post_batch([buf[_id] for _id in ids]):
+            return False
+        for _id in ids:
+            del buf[_id]
+    return True
+
+
+def run_change_stream_worker():
+    """
+    Event-driven alternative to polling (requires a replica set).
+    Changes are buffered and flushed to /ingest-batch once WORKER_BATCH_SIZE
+    docs are waiting or the oldest has waited WORKER_FLUSH_INTERVAL_SEC.
+    The resume token is checkpointed to WORKER_CHECKPOINT_FILE after each
+    delivered flush, so restarts and reconnects pick up where they left off.
+    """
+    coll = _get_collection()
+
+    print(
+        f"Starting change stream worker (batch {WORKER_BATCH_SIZE}, "
+        f"flush every {WORKER_FLUSH_INTERVAL_SEC}s)…"
+    )
+
+    pipeline = [
+        {"$match": {"operationType": {"$in": ["insert", "replace", "update"]}}},
+        {
+            "$project": {
+                "operationType": 1,
+                **{f"fullDocument.{field}": 1 for field in MONGO_PROJECTION},
             }
+        },
+    ]
 
-            try:
-                r = requests.post(f"{API_BASE}/ingest", json=payload, timeout=10)
-                r.raise_for_status()
-                print(
-                    f"[{datetime.utcnow().isoformat()}] Synced Mongo _id={payload['mongo_id']} to Chroma"
-                )
-                last_seen_id = doc["_id"]
-            except Exception as e:
-                print(f"[ERROR] Failed to call /ingest: {e}")
+    # Keyed by _id so repeated changes to one doc collapse (last write wins);
+    # Chroma rejects duplicate ids within a single upsert.
+    buf = {}
+    # Only advanced once everything read so far has been delivered, so a
+    # reopened stream replays exactly the undelivered events.
+    resume_token = _load_resume_token()
+
+    def checkpoint(token):
+        nonlocal resume_token
+        if token is not None and token != resume_token:
+            _save_resume_token(token)
+            resume_token = token
+
+    while True:
+        try:
+            # max_await_time_ms bounds how long try_next() blocks, so the flush
+            # timer still fires while the collection is idle.
+            with coll.watch(
+                pipeline,
+                full_document="updateLookup",
+                resume_after=resume_token,
+                batch_size=WORKER_BATCH_SIZE,
+                max_await_time_ms=1000,
+            ) as stream:
+                # Open the stream before scanning, so writes made during the
+                # scan are still delivered by the stream afterwards.
+                if resume_token is None:
+                    if not _catch_up(coll):
+                        raise _RetryLater()
+                    checkpoint(stream.resume_token)
+
+                last_flush = time.monotonic()
+                while stream.alive:
+                    # A full buffer that cannot be delivered stops reading, so
+                    # memory stays bounded; pending events wait in the oplog.
+                    if len(buf) < WORKER_BATCH_SIZE:
+                        change = stream.try_next()
+                        if change is not None and change.get("fullDocument"):
+                            doc = change["fullDocument"]
+                            buf[doc["_id"]] = doc
+
+                    if not buf:
+                        checkpoint(stream.resume_token)
+                        last_flush = time.monotonic()
+                        continue
+                    if (
+                        len(buf) >= WORKER_BATCH_SIZE
+                        or time.monotonic() - last_flush >= WORKER_FLUSH_INTERVAL_SEC
+                    ):
+                        if _flush(buf):
+                            checkpoint(stream.resume_token)
+                        else:
+                            time.sleep(POLL_INTERVAL_SEC)
+                        last_flush = time.monotonic()
+        except _RetryLater:
+            pass
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAM_HISTORY_LOST:
+                print(f"[ERROR] Change stream can no longer resume, catching up: {e}")
+                resume_token = None
+            else:
+                print(f"[ERROR] Change stream failed: {e}")
+        except PyMongoError as e:
+            print(f"[ERROR] Change stream failed: {e}")
 
+        # Deliver what was already read before reopening. The resume token is
+        # not advanced here, so these events are replayed; upserts are idempotent.
+        if buf:
+            _flush(buf)
         time.sleep(POLL_INTERVAL_SEC)
 
 
 if __name__ == "__main__":
-    run_polling_worker()
+    if USE_CHANGE_STREAM:
+        run_change_stream_worker()
+    else:
+        run_polling_worker()